@@ -0,0 +1,154 @@
+import argparse
+import difflib
+import multiprocessing
+import resource
+import statistics
+import time
+
+SAMPLE_TEXTS = [
+    "The quarterly report from Acme Corporation, headquartered in Chicago, shows revenue of 4.2 billion dollars, "
+    "up 12 percent year over year. Chief Executive Jane Miller attributed the growth to strong demand in Europe "
+    "and the launch of the company's new logistics platform. The board approved a dividend increase and a "
+    "share buyback programme worth 500 million dollars, to be executed over the next eighteen months.",
+    "This agreement is entered into between Northwind Traders Ltd., a company registered in London, and Contoso "
+    "GmbH of Berlin. Northwind shall supply industrial components under the terms set out in Schedule A. Either "
+    "party may terminate the agreement with ninety days written notice. Disputes shall be resolved by arbitration "
+    "in Geneva under the rules of the International Chamber of Commerce.",
+    "Researchers at Stanford University and the Max Planck Institute published a study describing a new battery "
+    "chemistry that doubles energy density while reducing reliance on cobalt. The team, led by Dr. Alan Chen, "
+    "tested prototype cells over two thousand charge cycles. Funding was provided by the National Science "
+    "Foundation and the European Research Council.",
+]
+
+
+def load_texts(pdf_path, max_chars=1024):
+    if not pdf_path:
+        return SAMPLE_TEXTS
+    import fitz  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        texts = [page.get_text()[:max_chars] for page in doc]
+    return [text for text in texts if text.strip()] or SAMPLE_TEXTS
+
+
+def rss_mb():
+    # Current resident set size from /proc, falls back to the peak on other platforms
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend, texts, runs, results):
+    """Load and exercise one backend. Runs in its own process so memory numbers don't mix."""
+    from services.pdf_service import PDFService
+
+    base_rss = rss_mb()
+    start_time = time.perf_counter()
+    service = PDFService(backend=backend)
+    load_time = time.perf_counter() - start_time
+
+    # Warm-up, the first call pays for lazy initialisation
+    service.summarizer(texts[0])
+    service.ner(texts[0])
+
+    summary_latencies, ner_latencies = [], []
+    summaries, entities = [], []
+    for _ in range(runs):
+        summaries, entities = [], []
+        for text in texts:
+            start_time = time.perf_counter()
+            summaries.append(service.summarizer(text)[0]['summary_text'])
+            summary_latencies.append(time.perf_counter() - start_time)
+
+            start_time = time.perf_counter()
+            entities.append(sorted({(entity['word'], entity['entity']) for entity in service.ner(text)}))
+            ner_latencies.append(time.perf_counter() - start_time)
+
+    results[backend] = {
+        "load_time": load_time,
+        "rss_mb": rss_mb() - base_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summary_latencies": summary_latencies,
+        "ner_latencies": ner_latencies,
+        "summaries": summaries,
+        "entities": entities,
+    }
+
+
+def entity_f1(reference, candidate):
+    reference, candidate = set(reference), set(candidate)
+    if not reference and not candidate:
+        return 1.0
+    overlap = len(reference & candidate)
+    if not overlap:
+        return 0.0
+    precision = overlap / len(candidate)
+    recall = overlap / len(reference)
+    return 2 * precision * recall / (precision + recall)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(results, texts):
+    reference = results.get("fp32")
+    print(f"\n{'backend':<8} {'load s':>7} {'RSS MB':>8} {'peak MB':>8} {'sum p50':>8} {'sum p95':>8} {'ner p50':>8} "
+          f"{'docs/s':>7} {'sum agr':>8} {'ner F1':>7}")
+    print("-" * 91)
+    for backend, result in results.items():
+        total_time = sum(result["summary_latencies"]) + sum(result["ner_latencies"])
+        throughput = len(result["summary_latencies"]) / total_time
+        if reference and backend != "fp32":
+            summary_agreement = statistics.mean(
+                difflib.SequenceMatcher(None, expected, actual).ratio()
+                for expected, actual in zip(reference["summaries"], result["summaries"])
+            )
+            ner_agreement = statistics.mean(
+                entity_f1(expected, actual)
+                for expected, actual in zip(reference["entities"], result["entities"])
+            )
+            agreement = f"{summary_agreement:>8.3f} {ner_agreement:>7.3f}"
+        else:
+            agreement = f"{'-':>8} {'-':>7}"
+        print(f"{backend:<8} {result['load_time']:>7.1f} {result['rss_mb']:>8.0f} {result['peak_rss_mb']:>8.0f} "
+              f"{percentile(result['summary_latencies'], 0.5):>8.2f} "
+              f"{percentile(result['summary_latencies'], 0.95):>8.2f} "
+              f"{percentile(result['ner_latencies'], 0.5):>8.2f} "
+              f"{throughput:>7.2f} {agreement}")
+    print(f"\n{len(texts)} texts per run. Latencies in seconds, docs/s counts one summary and one NER pass per doc.")
+    print("RSS MB is what the loaded models hold. Peak MB is the process high-water mark, which includes")
+    print("the fp32 weights loaded before quantization and is what a worker has to be sized for.")
+    print("Agreement is measured against fp32: summary similarity ratio and entity set F1.")
+
+
+def benchmark_inference():
+    """Compare latency, throughput, memory and output agreement of the PDFService inference backends."""
+    parser = argparse.ArgumentParser(description=benchmark_inference.__doc__)
+    parser.add_argument("--pdf", help="PDF whose pages are used as inputs (defaults to built-in samples)")
+    parser.add_argument("--backends", default="fp32,int8", help="Comma separated list of fp32, int8, onnx")
+    parser.add_argument("--runs", type=int, default=3, help="Timed passes over the inputs")
+    args = parser.parse_args()
+
+    texts = load_texts(args.pdf)
+    backends = args.backends.split(",")
+    if "fp32" not in backends:
+        print("Note: fp32 not selected, agreement will not be reported")
+
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager:
+        results = manager.dict()
+        for backend in backends:
+            print(f"Benchmarking {backend} backend...")
+            process = context.Process(target=run_backend, args=(backend, texts, args.runs, results))
+            process.start()
+            process.join()
+            if backend not in results:
+                print(f"ERROR: {backend} backend failed, see output above")
+        report(dict(results), texts)
+
+
+if __name__ == "__main__":
+    benchmark_inference()
@@ -1,8 +1,10 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from services.chat_service import ChatService
+from services.render_service import RenderService, MEDIA_TYPES
+from services.storage_service import StorageManager
 from pydantic import BaseModel
 import uvicorn
 import os
@@ -30,6 +32,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the viewer read thumbnail strip page offsets
+    expose_headers=["X-Page-Heights"],
 )
 
 # Create temp directory if it doesn't exist
@@ -39,6 +43,38 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # Mount the temp directory to serve files
 app.mount("/files", StaticFiles(directory="temp"), name="files")
 
+# Initialize render service for page images and thumbnails
+render_service = RenderService(upload_dir=UPLOAD_DIR)
+
+# Renders are keyed on file size and mtime, so clients may keep them for a day and revalidate with the ETag
+RENDER_CACHE_CONTROL = "public, max-age=86400"
+
+# Keep the upload store within its quota, evicting least recently used files and everything derived from them
+storage_manager = StorageManager(upload_dir=UPLOAD_DIR)
+storage_manager.add_derived_dir(render_service.cache_dir)
+storage_manager.on_evict(chat_service.evict)
+
+@app.on_event("startup")
+async def start_storage_manager():
+    storage_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    storage_manager.stop()
+    render_service.shutdown()
+    chat_service.ocr_service.shutdown()
+
+def cached_image_response(cache_path, etag: str, fmt: str, extra_headers=None):
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": RENDER_CACHE_CONTROL,
+        **(extra_headers or {}),
+    }
+    if cache_path is None:
+        # The client's copy is current, render_service matched it against If-None-Match
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path=cache_path, media_type=MEDIA_TYPES[fmt], headers=headers)
+
 @app.get("/")
 async def root():
     return {"message": "AI PDF Editor API"}
@@ -52,6 +88,7 @@ async def get_pdf(filename: str):
         if not file_path.exists():
             print(f"File not found: {file_path}")
             raise HTTPException(status_code=404, detail="PDF not found")
+        storage_manager.touch(filename)
         
         # Pre-cache the text if not already cached
         try:
@@ -81,6 +118,36 @@ async def get_pdf(filename: str):
         print(f"Error serving PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/pdf/{filename}/pages/{page_number}")
+async def get_pdf_page(request: Request, filename: str, page_number: int, dpi: int = 110, format: str = "png"):
+    try:
+        cache_path, etag = await render_service.render_page(
+            filename, page_number, dpi, format, request.headers.get("if-none-match")
+        )
+        storage_manager.touch(filename)
+        return cached_image_response(cache_path, etag, format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error rendering page {page_number} of {filename}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/pdf/{filename}/thumbnails")
+async def get_pdf_thumbnails(request: Request, filename: str, start: int = 1, count: int = 10, width: int = 160, format: str = "webp"):
+    try:
+        cache_path, etag, heights = await render_service.render_thumbnails(
+            filename, start, count, width, format, request.headers.get("if-none-match")
+        )
+        storage_manager.touch(filename)
+        # Pixel height of each page in the strip, top to bottom, starting at page `start`
+        extra_headers = {"X-Page-Heights": ",".join(str(height) for height in heights)} if heights else None
+        return cached_image_response(cache_path, etag, format, extra_headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error rendering thumbnails of {filename}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.options("/upload")
 async def upload_options():
     return {"message": "OK"}
@@ -114,6 +181,8 @@ async def upload_pdf(file: UploadFile = File(...)):
             f.write(contents)
             
         print(f"File saved successfully. Size: {len(contents)} bytes")
+        storage_manager.touch(safe_filename)
+        storage_manager.schedule_gc()
         
         # Pre-extract text to cache it
         try:
@@ -139,11 +208,11 @@ async def upload_pdf(file: UploadFile = File(...)):
 
 @app.post("/compare")
 async def compare_pdfs(original: UploadFile = File(...), compare: UploadFile = File(...)):
+    # Save files temporarily
+    orig_path = UPLOAD_DIR / f"orig_{original.filename}"
+    comp_path = UPLOAD_DIR / f"comp_{compare.filename}"
+    doc1 = doc2 = None
     try:
-        # Save files temporarily
-        orig_path = UPLOAD_DIR / f"orig_{original.filename}"
-        comp_path = UPLOAD_DIR / f"comp_{compare.filename}"
-        
         with open(orig_path, "wb") as f:
             f.write(await original.read())
         with open(comp_path, "wb") as f:
@@ -183,15 +252,16 @@ async def compare_pdfs(original: UploadFile = File(...), compare: UploadFile = F
                     'differences': differences
                 })
 
-        # Clean up
-        doc1.close()
-        doc2.close()
-        orig_path.unlink()
-        comp_path.unlink()
-
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Clean up even when the comparison fails
+        for doc in (doc1, doc2):
+            if doc is not None:
+                doc.close()
+        orig_path.unlink(missing_ok=True)
+        comp_path.unlink(missing_ok=True)
 
 class ChatRequest(BaseModel):
     message: str
@@ -217,7 +287,7 @@ async def chat(request: ChatRequest):
             return {"error": error_msg, "request_id": request_id}
         
         try:
-            response = await asyncio.wait_for(
+            response, prompt_tokens = await asyncio.wait_for(
                 chat_service.process_chat(request.message, request.pdf_url),
                 timeout=120.0  # 120 second timeout
             )
@@ -230,6 +300,8 @@ async def chat(request: ChatRequest):
             error_msg = "No response received from the AI model"
             print(f"Error: {error_msg}")
             return {"error": error_msg, "request_id": request_id}
+        # Only now is the file known to exist, unknown URLs must not create access entries
+        storage_manager.touch(chat_service.get_filename_from_url(request.pdf_url))
             
         end_time = time.time()
         processing_time = end_time - start_time
@@ -241,6 +313,7 @@ async def chat(request: ChatRequest):
             "response": response,
             "request_id": request_id,
             "processing_time": processing_time,
+            "prompt_tokens": prompt_tokens,
             "model": chat_service.model.model_name if chat_service.model else "unknown"
         }
         
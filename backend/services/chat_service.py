@@ -7,7 +7,13 @@ from io import BytesIO
 import asyncio
 from fastapi import HTTPException
 import time
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
+from services.prompt_builder import (
+    CONTEXT_TOKEN_BUDGET, HISTORY_TOKEN_RESERVE, build_document_context, count_tokens
+)
+from services.ocr_service import OCRService, needs_ocr
 
 load_dotenv()
 
@@ -27,6 +33,47 @@ try:
 except Exception as e:
     print(f"Error listing models: {str(e)}")
 
+# Upper bound on page texts kept for reuse across uploads and revisions
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_TEXT_CACHE_SIZE", "20000"))
+
+def _xref_value(doc, xref, key):
+    """Object number a dictionary key points to, or None when it is missing or direct."""
+    value_type, value = doc.xref_get_key(xref, key)
+    return int(value.split()[0]) if value_type == "xref" else None
+
+def _font_fingerprint(doc, font):
+    """Describe how a font maps character codes to text, without its object numbers.
+
+    Object numbers differ between revisions of the same document, so they must stay out of the
+    hash. The ToUnicode map and encoding differences are what decide the extracted text.
+    """
+    xref, _, font_type, basefont, name, encoding = font[:6]
+    parts = [name, font_type, basefont, encoding]
+    to_unicode = _xref_value(doc, xref, "ToUnicode")
+    if to_unicode:
+        parts.append(doc.xref_stream(to_unicode) or b"")
+    encoding_xref = _xref_value(doc, xref, "Encoding")
+    if encoding_xref:
+        parts.append(doc.xref_get_key(encoding_xref, "Differences")[1])
+    return repr(parts).encode()
+
+def page_fingerprint(page) -> str:
+    """Hash of a page's content stream, fonts and geometry, computed without extracting its text."""
+    digest = hashlib.sha256(page.read_contents())
+    # The same content bytes produce different text under different font encodings,
+    # e.g. subset fonts that assign codes in first-use order
+    for font in sorted(page.get_fonts(), key=lambda font: font[4]):
+        digest.update(_font_fingerprint(page.parent, font))
+    for xref, name, *_ in page.get_xobjects():
+        # Form XObjects hold their own content streams, often headers and tables
+        digest.update(name.encode())
+        digest.update(page.parent.xref_stream(xref) or b"")
+    for image in page.get_images():
+        # Scanned pages share the same tiny content stream, the image is what tells them apart
+        digest.update(page.parent.xref_stream_raw(image[0]) or b"")
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    return digest.hexdigest()
+
 class ChatService:
     def __init__(self):
         # Define models to try in order of preference
@@ -34,7 +81,12 @@ class ChatService:
         self.model = None
         self.chat_sessions = {}  # Store chat sessions per PDF URL
         self.pdf_cache = {}  # Cache for PDF text
+        self.pdf_pages = {}  # Per-page text for each cached PDF, used to build the chat context
+        self.session_tokens = {}  # Estimated tokens of each chat session's history, resent on every turn
+        self.turn_tokens = {}  # Tokens of each question/answer pair in a session's history, oldest first
+        self.page_cache = OrderedDict()  # Page text keyed by page fingerprint, shared across revisions
         self.UPLOAD_DIR = Path("temp")  # Match the upload directory from main.py
+        self.ocr_service = OCRService()  # OCR fallback for scanned pages
         
         # Try initializing with different models
         for model_name in self.model_names:
@@ -53,6 +105,44 @@ class ChatService:
         """Extract filename from PDF URL."""
         return pdf_url.split('/')[-1]
     
+    def cache_page_text(self, fingerprint: str, text: str):
+        self.page_cache[fingerprint] = text
+        if len(self.page_cache) > PAGE_CACHE_SIZE:
+            self.page_cache.popitem(last=False)
+    
+    def evict(self, filename: str):
+        """Drop cached text and chat sessions for a file that was removed from storage."""
+        for cache in (self.pdf_cache, self.pdf_pages, self.chat_sessions, self.session_tokens, self.turn_tokens):
+            for pdf_url in [url for url in cache if self.get_filename_from_url(url) == filename]:
+                del cache[pdf_url]
+    
+    def trim_history(self, pdf_url, message_tokens):
+        """Drop the oldest question/answer pairs until the next prompt fits CONTEXT_TOKEN_BUDGET.
+
+        The priming message with the document and the model's reply to it are always kept.
+        Returns the estimated prompt tokens, raises a 413 when the message can't fit at all.
+        """
+        chat = self.chat_sessions[pdf_url]
+        turns = self.turn_tokens[pdf_url]
+        prompt_tokens = self.session_tokens[pdf_url] + message_tokens
+        if prompt_tokens - sum(turns) > CONTEXT_TOKEN_BUDGET:
+            # Doesn't fit even without earlier turns, keep the history for the next, shorter message
+            raise HTTPException(
+                status_code=413,
+                detail=f"Message is too long: the prompt would be about {prompt_tokens - sum(turns)} tokens, "
+                       f"the limit is {CONTEXT_TOKEN_BUDGET}"
+            )
+        dropped = 0
+        while prompt_tokens > CONTEXT_TOKEN_BUDGET and turns:
+            history = chat.history
+            chat.history = history[:2] + history[4:]
+            prompt_tokens -= turns.pop(0)
+            dropped += 1
+        self.session_tokens[pdf_url] = prompt_tokens - message_tokens
+        if dropped:
+            print(f"Dropped the {dropped} oldest turns from the chat history to fit the context budget")
+        return prompt_tokens
+    
     async def extract_text_from_pdf(self, pdf_url):
         try:
             # Get local filename from URL
@@ -76,19 +166,46 @@ class ChatService:
                 # Open PDF directly from local file
                 doc = fitz.open(file_path)
                 
-                text = ""
+                pages = []
                 total_pages = doc.page_count
+                reused_pages = 0
+                ocr_pages = []  # (page index, fingerprint) of pages without a text layer
                 print(f"Extracting text from {total_pages} pages...")
                 
                 for page_num, page in enumerate(doc, 1):
-                    print(f"Extracting text from page {page_num}/{total_pages}")
-                    text += page.get_text()
+                    # Pages unchanged since an earlier upload or revision are not extracted again
+                    fingerprint = page_fingerprint(page)
+                    page_text = self.page_cache.get(fingerprint)
+                    if page_text is not None:
+                        self.page_cache.move_to_end(fingerprint)
+                        reused_pages += 1
+                    else:
+                        page_text = page.get_text()
+                        if needs_ocr(page, page_text):
+                            ocr_pages.append((page_num - 1, fingerprint))
+                        else:
+                            self.cache_page_text(fingerprint, page_text)
+                    pages.append(page_text)
                     if page_num % 5 == 0:  # Progress update every 5 pages
                         print(f"Processed {page_num}/{total_pages} pages...")
                 
                 doc.close()
+                
+                if ocr_pages:
+                    print(f"Running OCR on {len(ocr_pages)} scanned pages...")
+                    ocr_texts = await self.ocr_service.ocr_pages(file_path, ocr_pages)
+                    for page_index, fingerprint in ocr_pages:
+                        pages[page_index] = ocr_texts[page_index]
+                        if pages[page_index].strip():
+                            # Failed pages stay uncached so the next extraction retries them
+                            self.cache_page_text(fingerprint, pages[page_index])
+                
+                text = "".join(pages)
                 extract_time = time.time() - start_time
-                print(f"Text extraction completed in {extract_time:.2f} seconds")
+                print(
+                    f"Text extraction completed in {extract_time:.2f} seconds "
+                    f"({reused_pages}/{total_pages} pages reused, {len(ocr_pages)} OCR'd)"
+                )
                 print(f"Total characters extracted: {len(text)}")
                 
                 if not text.strip():
@@ -98,6 +215,7 @@ class ChatService:
                 
                 # Cache the result
                 self.pdf_cache[pdf_url] = text
+                self.pdf_pages[pdf_url] = pages
                 return text
                 
             except Exception as e:
@@ -113,6 +231,7 @@ class ChatService:
             raise HTTPException(status_code=500, detail=error_msg)
 
     async def process_chat(self, message, pdf_url):
+        """Answer a message about a PDF. Returns (response text, estimated prompt tokens)."""
         try:
             print("\n--- Starting chat processing ---")
             start_time = time.time()
@@ -124,10 +243,22 @@ class ChatService:
                 # Extract text if needed
                 if pdf_url not in self.pdf_cache:
                     print("Extracting text from PDF...")
-                    text = await self.extract_text_from_pdf(pdf_url)
+                    await self.extract_text_from_pdf(pdf_url)
                 else:
                     print("Using cached PDF text")
-                    text = self.pdf_cache[pdf_url]
+                
+                # Drop repeated headers/footers and pack the pages into the context budget,
+                # leaving room for the conversation that follows
+                text, context_stats = build_document_context(
+                    self.pdf_pages[pdf_url], CONTEXT_TOKEN_BUDGET - HISTORY_TOKEN_RESERVE
+                )
+                print(
+                    f"Context: {context_stats['context_tokens']} tokens from "
+                    f"{context_stats['pages_used']}/{context_stats['pages_total']} pages, "
+                    f"{context_stats['boilerplate_lines']} boilerplate lines removed"
+                )
+                if context_stats["truncated"]:
+                    print("Warning: Document exceeds the context budget, later pages were left out")
                 
                 print("Initializing chat with context...")
                 # Prepare a clear and concise context
@@ -151,6 +282,8 @@ class ChatService:
                     
                     # Store the chat session
                     self.chat_sessions[pdf_url] = chat
+                    self.session_tokens[pdf_url] = count_tokens(context) + count_tokens(response.text)
+                    self.turn_tokens[pdf_url] = []
                     
                 except Exception as e:
                     error_msg = f"Failed to initialize chat: {str(e)}"
@@ -164,15 +297,22 @@ class ChatService:
             
             # Process the user's message
             print(f"Processing user message: {message[:100]}...")
+            # The whole session history is sent along with every message
+            message_tokens = count_tokens(message)
+            prompt_tokens = self.trim_history(pdf_url, message_tokens)
+            print(f"Estimated prompt size: {prompt_tokens} tokens")
             try:
                 response = chat.send_message(message)
                 if not response:
                     raise Exception("No response received from model")
+                response_tokens = count_tokens(response.text)
+                self.session_tokens[pdf_url] = prompt_tokens + response_tokens
+                self.turn_tokens[pdf_url].append(message_tokens + response_tokens)
                 
                 end_time = time.time()
                 print(f"Chat processing completed in {end_time - start_time:.2f} seconds")
                 print(f"Response preview: {response.text[:100]}...")
-                return response.text
+                return response.text, prompt_tokens
                 
             except Exception as e:
                 error_msg = f"Failed to get model response: {str(e)}"
@@ -0,0 +1,56 @@
+from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM, AutoModelForTokenClassification
+import threading
+import torch
+import os
+
+# fp32: stock PyTorch weights
+# int8: PyTorch dynamic quantization of every Linear layer, weights stored as int8
+# onnx: graph exported to ONNX Runtime (requires optimum[onnxruntime])
+BACKENDS = ("fp32", "int8", "onnx")
+DEFAULT_BACKEND = os.getenv("INFERENCE_BACKEND", "fp32")
+
+MODEL_CLASSES = {
+    "summarization": AutoModelForSeq2SeqLM,
+    "ner": AutoModelForTokenClassification,
+}
+ORT_MODEL_CLASSES = {
+    "summarization": "ORTModelForSeq2SeqLM",
+    "ner": "ORTModelForTokenClassification",
+}
+
+# One instance per (task, model, backend) for the whole process, shared by every PDFService
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _load_model(task, model_name, backend):
+    if backend == "onnx":
+        try:
+            import optimum.onnxruntime as ort
+        except ImportError:
+            raise Exception("The onnx inference backend requires optimum[onnxruntime]. Install it or use fp32/int8.")
+        return getattr(ort, ORT_MODEL_CLASSES[task]).from_pretrained(model_name, export=True)
+
+    model = MODEL_CLASSES[task].from_pretrained(model_name)
+    model.eval()
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_pipeline(task, model_name, backend=DEFAULT_BACKEND, **kwargs):
+    """Return the shared pipeline for a task and model, loading it on first use."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}. Use one of: {', '.join(BACKENDS)}")
+
+    key = (task, model_name, backend, tuple(sorted(kwargs.items())))
+    with _pipelines_lock:
+        if key not in _pipelines:
+            print(f"Loading {task} model {model_name} with {backend} backend...")
+            _pipelines[key] = pipeline(
+                task,
+                model=_load_model(task, model_name, backend),
+                tokenizer=AutoTokenizer.from_pretrained(model_name),
+                **kwargs
+            )
+        return _pipelines[key]
@@ -0,0 +1,121 @@
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import time
+
+# 300 DPI is where Tesseract's accuracy levels off, higher only costs time
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_CACHE_BYTES = int(os.getenv("OCR_CACHE_MB", "256")) * 1024 * 1024
+# Prune down to this fraction of the cap so the next few pages don't trigger another pass
+CACHE_LOW_WATERMARK = 0.9
+# Pages with less text than this are treated as having no text layer
+MIN_TEXT_CHARS = 20
+
+
+def needs_ocr(page, text):
+    """True for pages whose text layer is empty but that carry images, i.e. scans."""
+    return len(text.strip()) < MIN_TEXT_CHARS and bool(page.get_images())
+
+
+def _ocr_page(pdf_path, page_index, dpi, language):
+    """Render one page in grayscale and run Tesseract on it. Runs inside a worker process."""
+    with fitz.open(pdf_path) as doc:
+        pix = doc[page_index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+    return pytesseract.image_to_string(image, lang=language)
+
+
+class OCRService:
+    def __init__(self, cache_dir=Path("ocr_cache"), dpi=OCR_DPI, language=OCR_LANGUAGE, max_workers=None,
+                 max_cache_bytes=OCR_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.dpi = dpi
+        self.language = language
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_path(self, fingerprint):
+        # Same page at another DPI or language is a different result
+        key = hashlib.sha256(f"{fingerprint}:{self.dpi}:{self.language}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.txt"
+
+    async def _ocr_cached(self, pdf_path, page_index, fingerprint):
+        cache_path = self._cache_path(fingerprint)
+        try:
+            text = cache_path.read_text(encoding="utf-8")
+            # The mtime doubles as last use, which is what pruning orders by
+            os.utime(cache_path)
+            return text
+        except FileNotFoundError:
+            pass
+
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(
+            self.executor, _ocr_page, str(pdf_path), page_index, self.dpi, self.language
+        )
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+        return text
+
+    def _prune_cache(self):
+        """Delete least recently used entries until the cache is under its cap. Returns entries removed."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        usage = sum(size for _, size, _ in entries)
+        if usage <= self.max_cache_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if usage <= self.max_cache_bytes * CACHE_LOW_WATERMARK:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            usage -= size
+            removed += 1
+        return removed
+
+    async def ocr_pages(self, pdf_path, pages):
+        """OCR (page index, page fingerprint) pairs in parallel. Returns page index -> text.
+
+        Results are cached on disk by page fingerprint, so a page is only OCR'd once across
+        uploads, revisions and restarts while its entry is among the most recently used ones
+        that fit in max_cache_bytes. Pages that fail come back as empty text.
+        """
+        start_time = time.time()
+        results = await asyncio.gather(
+            *(self._ocr_cached(pdf_path, page_index, fingerprint) for page_index, fingerprint in pages),
+            return_exceptions=True
+        )
+
+        texts = {}
+        for (page_index, _), result in zip(pages, results):
+            if isinstance(result, Exception):
+                print(f"Warning: OCR failed for page {page_index + 1}: {str(result)}")
+                result = ""
+            texts[page_index] = result
+        print(f"OCR of {len(pages)} pages completed in {time.time() - start_time:.2f} seconds")
+
+        try:
+            removed = await asyncio.to_thread(self._prune_cache)
+            if removed:
+                print(f"Pruned {removed} entries from the OCR cache")
+        except Exception as e:
+            print(f"Warning: Failed to prune OCR cache: {str(e)}")
+        return texts
@@ -1,22 +1,28 @@
 import fitz  # PyMuPDF
-from transformers import pipeline
+from services.inference import get_pipeline, DEFAULT_BACKEND
 import pytesseract
 from PIL import Image
 import numpy as np
 
 class PDFService:
-    def __init__(self):
-        # Initialize free models
-        self.summarizer = pipeline(
+    SUMMARIZATION_MODEL = "facebook/bart-large-cnn"
+    NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
+
+    def __init__(self, backend=DEFAULT_BACKEND):
+        # Initialize free models, shared with every other PDFService using the same backend
+        self.backend = backend
+        self.summarizer = get_pipeline(
             "summarization",
-            model="facebook/bart-large-cnn",
+            self.SUMMARIZATION_MODEL,
+            backend,
             max_length=130,
             min_length=30,
         )
         
-        self.ner = pipeline(
+        self.ner = get_pipeline(
             "ner",
-            model="dbmdz/bert-large-cased-finetuned-conll03-english"
+            self.NER_MODEL,
+            backend
         )
 
     def extract_text(self, pdf_path):
@@ -0,0 +1,129 @@
+from collections import Counter
+import os
+import re
+
+# Budget for the document context sent when a chat session is primed
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "200000"))
+# Part of that budget left free for the conversation, the document gets the rest
+HISTORY_TOKEN_RESERVE = int(os.getenv("CHAT_HISTORY_TOKEN_RESERVE", "50000"))
+
+# Words, digit runs and single punctuation marks, roughly how SentencePiece splits text
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_+")
+# "Page 3", "Page 3 of 20", "3 of 20" and "3 / 20" are page numbers wherever they sit on the outer lines
+EXPLICIT_PAGE_NUMBER = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+)$", re.IGNORECASE)
+# A bare number only counts as a page number when it follows the page order
+BARE_NUMBER = re.compile(r"^\d{1,5}$")
+# Running headers and footers live in the first and last few lines of a page
+EDGE_LINES = 2
+MAX_BOILERPLATE_LINE = 120
+
+
+def count_tokens(text):
+    """Local token estimate, slightly on the high side so budgets are not overrun."""
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece.isdigit():
+            # Gemini tokenizes numbers one digit at a time
+            tokens += len(piece)
+        else:
+            tokens += 1 + (len(piece) - 1) // 5
+    return tokens
+
+
+def _content_indexes(lines):
+    return [index for index, line in enumerate(lines) if line.strip()]
+
+
+def _page_number_offset(page_lines):
+    """Offset between printed page numbers and page positions, or None if the numbers don't count up."""
+    offsets = Counter()
+    for position, lines in enumerate(page_lines, 1):
+        content = _content_indexes(lines)
+        if not content:
+            continue
+        for index in {content[0], content[-1]}:
+            candidate = lines[index].strip()
+            if BARE_NUMBER.match(candidate):
+                offsets[int(candidate) - position] += 1
+    if not offsets:
+        return None
+    offset, count = offsets.most_common(1)[0]
+    # One matching page proves nothing, e.g. a total that happens to equal its page number
+    if count < 2 or count < len(page_lines) // 2:
+        return None
+    return offset
+
+
+def strip_boilerplate(pages):
+    """Remove page numbers and header/footer lines that repeat across pages. Returns (pages, removed line count).
+
+    Only the first and last EDGE_LINES lines of a page are candidates. Page numbers are only taken
+    from the outermost line, and bare numbers only when they go up page by page.
+    """
+    page_lines = [page.splitlines() for page in pages]
+    page_edges = []
+    for lines in page_lines:
+        content = _content_indexes(lines)
+        page_edges.append(set(content[:EDGE_LINES] + content[-EDGE_LINES:]))
+    edge_counts = Counter(
+        line
+        for lines, edges in zip(page_lines, page_edges)
+        for line in {lines[index].strip() for index in edges}
+        if len(line) <= MAX_BOILERPLATE_LINE
+    )
+    repeat_threshold = max(3, len(pages) // 2)
+    boilerplate = {line for line, count in edge_counts.items() if count >= repeat_threshold}
+    page_offset = _page_number_offset(page_lines)
+
+    stripped = []
+    removed = 0
+    for position, (lines, edges) in enumerate(zip(page_lines, page_edges), 1):
+        content = _content_indexes(lines)
+        outer = {content[0], content[-1]} if content else set()
+        drop = set()
+        for index in edges:
+            candidate = lines[index].strip()
+            if candidate in boilerplate:
+                drop.add(index)
+            elif index in outer and EXPLICIT_PAGE_NUMBER.match(candidate):
+                drop.add(index)
+            elif (index in outer and page_offset is not None and BARE_NUMBER.match(candidate)
+                  and int(candidate) - position == page_offset):
+                drop.add(index)
+        removed += len(drop)
+        stripped.append("\n".join(line for index, line in enumerate(lines) if index not in drop))
+    return stripped, removed
+
+
+def build_document_context(pages, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Pack a document's pages, in order, into the token budget. Returns (context, stats)."""
+    stripped, boilerplate_lines = strip_boilerplate(pages)
+
+    selected = []
+    seen = set()
+    used_tokens = 0
+    duplicate_pages = 0
+    for page in stripped:
+        if not page.strip():
+            continue
+        if page in seen:
+            # Repeated pages, e.g. blank forms or separator sheets, are sent once
+            duplicate_pages += 1
+            continue
+        tokens = count_tokens(page)
+        if used_tokens + tokens > token_budget:
+            break
+        seen.add(page)
+        selected.append(page)
+        used_tokens += tokens
+
+    stats = {
+        "context_tokens": used_tokens,
+        "pages_total": len(pages),
+        "pages_used": len(selected),
+        "duplicate_pages": duplicate_pages,
+        "boilerplate_lines": boilerplate_lines,
+        "truncated": len(selected) + duplicate_pages < sum(1 for page in stripped if page.strip()),
+    }
+    return "\n".join(selected), stats
@@ -0,0 +1,198 @@
+import fitz  # PyMuPDF
+from PIL import Image
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+}
+MIN_DPI = 36
+MAX_DPI = 300
+MAX_THUMBNAIL_WIDTH = 400
+MAX_THUMBNAILS_PER_STRIP = 50
+
+
+def _encode(image, fmt):
+    """Encode a PIL image in the requested output format."""
+    buffer = BytesIO()
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", quality=80, method=4)
+    else:
+        image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+
+class PageNotFound(Exception):
+    """Raised by a worker when the requested page is outside the document."""
+
+
+def _pixmap_to_image(pix):
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+
+def _check_page(doc, page_index):
+    if not 0 <= page_index < doc.page_count:
+        raise PageNotFound(f"Page {page_index + 1} not found. PDF has {doc.page_count} pages")
+
+
+def _render_page(pdf_path, page_index, dpi, fmt):
+    """Render a single page. Runs inside a worker process. Returns (image bytes, None)."""
+    doc = fitz.open(pdf_path)
+    try:
+        _check_page(doc, page_index)
+        pix = doc[page_index].get_pixmap(dpi=dpi, alpha=False)
+        if fmt == "png":
+            # PyMuPDF encodes PNG natively, no need for a PIL round trip
+            return pix.tobytes("png"), None
+        return _encode(_pixmap_to_image(pix), fmt), None
+    finally:
+        doc.close()
+
+
+def _render_strip(pdf_path, start_index, count, width, fmt):
+    """Render pages stacked top to bottom into one thumbnail strip. Runs inside a worker process.
+
+    Returns (image bytes, height of each page in pixels) so viewers can locate pages in the strip.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        _check_page(doc, start_index)
+        images = []
+        for page_index in range(start_index, min(start_index + count, doc.page_count)):
+            page = doc[page_index]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            images.append(_pixmap_to_image(pix))
+    finally:
+        doc.close()
+
+    strip = Image.new("RGB", (width, sum(image.height for image in images)), "white")
+    offset = 0
+    for image in images:
+        strip.paste(image, (0, offset))
+        offset += image.height
+    return _encode(strip, fmt), [image.height for image in images]
+
+
+class RenderService:
+    def __init__(self, upload_dir=Path("temp"), cache_dir=Path("render_cache"), max_workers=None):
+        self.upload_dir = upload_dir
+        # Kept outside the upload directory so cached renders are not exposed through /files
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or max(1, (os.cpu_count() or 2) // 2))
+        self._pending = {}  # Renders in flight, so concurrent requests for the same image share one job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _source_path(self, filename):
+        file_path = self.upload_dir / filename
+        if file_path.name != filename or not file_path.exists():
+            raise HTTPException(status_code=404, detail="PDF not found")
+        return file_path
+
+    def _cache_key(self, file_path, *parts):
+        """Cache key tied to the file's size and mtime, so a replaced file never serves stale renders."""
+        stat = file_path.stat()
+        raw = ":".join(str(part) for part in (file_path.name, stat.st_size, stat.st_mtime_ns, *parts))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _validate_format(self, fmt):
+        if fmt not in MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported image format: {fmt}. Use one of: {', '.join(MEDIA_TYPES)}"
+            )
+
+    def _read_meta(self, cache_path):
+        meta_path = cache_path.with_suffix(".json")
+        return json.loads(meta_path.read_text()) if meta_path.exists() else None
+
+    async def _get_or_render(self, filename, key, fmt, if_none_match, render_fn, *args):
+        """Return (cache path, metadata), or (None, None) when the client's copy is current.
+
+        Cache hits and revalidations only need the stat() behind the key, the PDF is never opened.
+        """
+        if if_none_match == f'"{key}"':
+            # The key only changes with the file, so a matching ETag is current even if the render was evicted
+            return None, None
+        cache_path = self.cache_dir / filename / f"{key}.{fmt}"
+        if cache_path.exists():
+            return cache_path, self._read_meta(cache_path)
+
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(
+                self._render_to_cache(cache_path, render_fn, *args)
+            )
+            self._pending[key].add_done_callback(lambda _: self._pending.pop(key, None))
+        try:
+            meta = await asyncio.shield(self._pending[key])
+        except PageNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error reading PDF file: {str(e)}")
+        return cache_path, meta
+
+    async def _render_to_cache(self, cache_path, render_fn, *args):
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        data, meta = await loop.run_in_executor(self.executor, render_fn, *args)
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        if meta is not None:
+            # Written before the image, so an image in the cache always has its metadata
+            cache_path.with_suffix(".json").write_text(json.dumps(meta))
+        # Write to a temp file first so readers never see a partial image
+        tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, cache_path)
+        print(f"Rendered {cache_path.name} ({len(data)} bytes) in {time.time() - start_time:.2f} seconds")
+        return meta
+
+    async def render_page(self, filename, page_number, dpi=110, fmt="png", if_none_match=None):
+        """Render a 1-based page number and return (cache path, etag).
+
+        The cache path is None when if_none_match already names the current render.
+        """
+        self._validate_format(fmt)
+        if not MIN_DPI <= dpi <= MAX_DPI:
+            raise HTTPException(status_code=400, detail=f"DPI must be between {MIN_DPI} and {MAX_DPI}")
+        if page_number < 1:
+            raise HTTPException(status_code=404, detail=f"Page {page_number} not found")
+
+        file_path = self._source_path(filename)
+        key = self._cache_key(file_path, "page", page_number, dpi, fmt)
+        cache_path, _ = await self._get_or_render(
+            filename, key, fmt, if_none_match, _render_page, str(file_path), page_number - 1, dpi, fmt
+        )
+        return cache_path, key
+
+    async def render_thumbnails(self, filename, start=1, count=10, width=160, fmt="webp", if_none_match=None):
+        """Render a thumbnail strip starting at a 1-based page number.
+
+        Returns (cache path, etag, page heights in pixels). The cache path and heights are None
+        when if_none_match already names the current render.
+        """
+        self._validate_format(fmt)
+        if not 16 <= width <= MAX_THUMBNAIL_WIDTH:
+            raise HTTPException(status_code=400, detail=f"Width must be between 16 and {MAX_THUMBNAIL_WIDTH}")
+        if not 1 <= count <= MAX_THUMBNAILS_PER_STRIP:
+            raise HTTPException(status_code=400, detail=f"Count must be between 1 and {MAX_THUMBNAILS_PER_STRIP}")
+        if start < 1:
+            raise HTTPException(status_code=404, detail=f"Page {start} not found")
+
+        file_path = self._source_path(filename)
+        key = self._cache_key(file_path, "thumbnails", start, count, width, fmt)
+        cache_path, heights = await self._get_or_render(
+            filename, key, fmt, if_none_match, _render_strip, str(file_path), start - 1, count, width, fmt
+        )
+        return cache_path, key, heights
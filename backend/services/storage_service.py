@@ -0,0 +1,132 @@
+from pathlib import Path
+import asyncio
+import os
+import shutil
+import time
+
+# Defaults can be overridden per deployment through the environment
+DEFAULT_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_MB", "1024")) * 1024 * 1024
+DEFAULT_GC_INTERVAL = float(os.getenv("STORAGE_GC_INTERVAL_SECONDS", "300"))
+DEFAULT_MIN_IDLE_SECONDS = float(os.getenv("STORAGE_MIN_IDLE_SECONDS", "600"))
+# Evict down to this fraction of the quota so GC does not run again on the next upload
+LOW_WATERMARK = 0.9
+
+
+class StorageManager:
+    def __init__(self, upload_dir=Path("temp"), quota_bytes=DEFAULT_QUOTA_BYTES,
+                 gc_interval=DEFAULT_GC_INTERVAL, min_idle_seconds=DEFAULT_MIN_IDLE_SECONDS):
+        self.upload_dir = upload_dir
+        self.quota_bytes = quota_bytes
+        self.gc_interval = gc_interval
+        self.min_idle_seconds = min_idle_seconds
+        self.last_access = {}  # filename -> last access timestamp
+        self.derived_dirs = []  # Cache directories holding one subdirectory per uploaded file
+        self.eviction_callbacks = []  # Called with the filename of every evicted upload
+        self._gc_lock = asyncio.Lock()
+        self._gc_task = None
+        self._periodic_task = None
+
+    def add_derived_dir(self, path):
+        """Count and remove <path>/<filename> together with the upload it was derived from."""
+        self.derived_dirs.append(path)
+
+    def on_evict(self, callback):
+        self.eviction_callbacks.append(callback)
+
+    def touch(self, filename):
+        # Names that aren't stored uploads would otherwise stay in last_access forever
+        if (self.upload_dir / filename).is_file():
+            self.last_access[filename] = time.time()
+
+    def _dir_size(self, path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _scan(self):
+        """Return (filename, bytes including derived caches, last access) for every upload."""
+        entries = []
+        for entry in os.scandir(self.upload_dir):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            size = stat.st_size
+            for derived_dir in self.derived_dirs:
+                size += self._dir_size(derived_dir / entry.name)
+            # Files from before a restart fall back to their modification time
+            last_access = self.last_access.get(entry.name, stat.st_mtime)
+            entries.append((entry.name, size, last_access))
+        return entries
+
+    def _remove(self, filename):
+        try:
+            (self.upload_dir / filename).unlink()
+        except FileNotFoundError:
+            pass
+        for derived_dir in self.derived_dirs:
+            shutil.rmtree(derived_dir / filename, ignore_errors=True)
+
+    def _collect(self):
+        """Evict least recently used uploads until usage is under the low watermark. Runs in a worker thread."""
+        entries = self._scan()
+        usage = sum(size for _, size, _ in entries)
+        if usage <= self.quota_bytes:
+            return [], usage
+
+        target = self.quota_bytes * LOW_WATERMARK
+        now = time.time()
+        evicted = []
+        for filename, size, last_access in sorted(entries, key=lambda entry: entry[2]):
+            if usage <= target:
+                break
+            if now - last_access < self.min_idle_seconds:
+                # Everything after this was used even more recently
+                break
+            self._remove(filename)
+            evicted.append(filename)
+            usage -= size
+        return evicted, usage
+
+    async def collect_garbage(self):
+        async with self._gc_lock:
+            start_time = time.time()
+            evicted, usage = await asyncio.to_thread(self._collect)
+            for filename in evicted:
+                self.last_access.pop(filename, None)
+                for callback in self.eviction_callbacks:
+                    try:
+                        callback(filename)
+                    except Exception as e:
+                        print(f"Warning: Eviction callback failed for {filename}: {str(e)}")
+            if evicted:
+                print(f"Storage GC evicted {len(evicted)} files in {time.time() - start_time:.2f} seconds")
+            if usage > self.quota_bytes:
+                print(f"Warning: Storage usage {usage} bytes still exceeds quota of {self.quota_bytes} bytes")
+            return evicted
+
+    def schedule_gc(self):
+        """Run a GC pass in the background unless one is already pending."""
+        if self._gc_task is None or self._gc_task.done():
+            self._gc_task = asyncio.create_task(self.collect_garbage())
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await self.collect_garbage()
+            except Exception as e:
+                print(f"Error during storage GC: {str(e)}")
+            await asyncio.sleep(self.gc_interval)
+
+    def start(self):
+        if self._periodic_task is None:
+            self._periodic_task = asyncio.create_task(self._run_periodically())
+
+    def stop(self):
+        if self._periodic_task is not None:
+            self._periodic_task.cancel()
+            self._periodic_task = None
@@ -1,30 +1,54 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from ..services.pdf_processor import PDFProcessor
 from ..services.embeddings import EmbeddingService
 from ..services.vector_store import VectorStore
 from ..services.llm import LLMService
+from ..services.ingestion import IngestionService
+from ..services.ocr import OCRService
+from ..services.retrieval import RetrievalService, passage_labels, passage_sources
 from ..core.config import get_settings
-from ..models.schemas import QueryRequest, QueryResponse
+from ..models.schemas import QueryRequest, QueryResponse, Source, PromptStats, BatchQueryRequest, BatchAnswer
+import asyncio
+import json
+import time
+from typing import Optional
+import uuid
 
 router = APIRouter()
 settings = get_settings()
 
+ocr_service = OCRService(
+    cache_dir=settings.OCR_CACHE_DIR,
+    dpi=settings.OCR_DPI,
+    language=settings.OCR_LANGUAGE,
+    max_cache_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024
+)
 pdf_processor = PDFProcessor(
     chunk_size=settings.CHUNK_SIZE,
-    chunk_overlap=settings.CHUNK_OVERLAP
+    chunk_overlap=settings.CHUNK_OVERLAP,
+    ocr_service=ocr_service
 )
 embedding_service = EmbeddingService(settings.GOOGLE_API_KEY)
 vector_store = VectorStore(settings.CHROMA_PERSIST_DIR)
-llm_service = LLMService(settings.GOOGLE_API_KEY)
+llm_service = LLMService(
+    settings.GOOGLE_API_KEY,
+    context_token_budget=settings.CONTEXT_TOKEN_BUDGET,
+    chunk_overlap=settings.CHUNK_OVERLAP
+)
+retrieval_service = RetrievalService(
+    vector_store,
+    top_k=settings.TOP_K_PER_DOCUMENT
+)
+ingestion_service = IngestionService(pdf_processor, embedding_service, vector_store)
 
 @router.post("/upload")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(file: UploadFile = File(...), document_id: Optional[str] = Form(None)):
+    # Passing the document_id of an earlier upload ingests the file as a new revision of it
     try:
-        text = pdf_processor.extract_text(file.file)
-        chunks = pdf_processor.split_text(text)
-        embeddings = await embedding_service.get_embeddings(chunks)
-        await vector_store.add_documents(chunks, embeddings)
-        return {"message": "PDF processed successfully"}
+        document_id = document_id or uuid.uuid4().hex
+        stats = await ingestion_service.ingest(file.file, document_id, file.filename)
+        return {"message": "PDF processed successfully", "document_id": document_id, **stats}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -32,11 +56,116 @@ async def upload_pdf(file: UploadFile = File(...)):
 async def query_pdf(request: QueryRequest):
     try:
         query_embedding = await embedding_service.get_embeddings([request.query])
+        if request.document_ids:
+            return await query_documents(request.query, query_embedding[0], request.document_ids)
         results = await vector_store.query(query_embedding[0])
-        response = await llm_service.generate_response(
+        response, prompt_stats, _ = await llm_service.generate_response(
             request.query,
             results['documents'][0]
         )
-        return QueryResponse(answer=response)
+        return QueryResponse(answer=response, prompt=PromptStats(**prompt_stats))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+async def query_documents(query: str, query_embedding, document_ids) -> QueryResponse:
+    # Deduplicate while keeping the caller's order
+    document_ids = list(dict.fromkeys(document_ids))
+    passages, missing, failed = await retrieval_service.retrieve(query_embedding, document_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Unknown document ids: {', '.join(missing)}")
+    if not passages:
+        raise HTTPException(status_code=502, detail=f"Retrieval failed for documents: {', '.join(failed)}")
+
+    response, prompt_stats, used = await llm_service.generate_response(
+        query,
+        [passage["text"] for passage in passages],
+        passage_labels(passages)
+    )
+    # Cite only what the model was shown, the prompt builder may leave passages out to fit the budget
+    used_passages = [passages[index] for index in used]
+    return QueryResponse(
+        answer=response,
+        sources=[Source(**source) for source in passage_sources(used_passages)],
+        prompt=PromptStats(**prompt_stats),
+        failed_document_ids=failed
+    )
+
+@router.post("/query/batch")
+async def batch_query_pdf(request: BatchQueryRequest):
+    questions = request.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    if len(questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: {len(questions)}. The limit is {settings.BATCH_MAX_QUESTIONS}"
+        )
+    concurrency = max(1, min(request.max_concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY))
+
+    start_time = time.perf_counter()
+    try:
+        # One embedding request and one vector search for the whole questionnaire
+        query_embeddings = await embedding_service.get_query_embeddings(questions)
+        passages_per_question = await retrieval_service.retrieve_batch(query_embeddings, request.document_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not any(passages_per_question):
+        raise HTTPException(status_code=404, detail="No content found for the requested document")
+    retrieval_time = time.perf_counter() - start_time
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int, question: str, passages) -> BatchAnswer:
+        async with semaphore:
+            question_start = time.perf_counter()
+            try:
+                response, prompt_stats, used = await llm_service.generate_response(
+                    question,
+                    [passage["text"] for passage in passages],
+                    passage_labels(passages),
+                    raise_errors=True
+                )
+                return BatchAnswer(
+                    index=index,
+                    question=question,
+                    answer=response,
+                    sources=[Source(**source) for source in passage_sources([passages[i] for i in used])],
+                    prompt=PromptStats(**prompt_stats),
+                    latency=time.perf_counter() - question_start
+                )
+            except Exception as e:
+                return BatchAnswer(
+                    index=index,
+                    question=question,
+                    error=str(e),
+                    latency=time.perf_counter() - question_start
+                )
+
+    async def stream_answers():
+        tasks = [
+            asyncio.create_task(answer(index, question, passages))
+            for index, (question, passages) in enumerate(zip(questions, passages_per_question))
+        ]
+        failed = 0
+        try:
+            # Each answer is sent as one JSON line as soon as it completes
+            for next_answer in asyncio.as_completed(tasks):
+                result = await next_answer
+                failed += result.error is not None
+                yield result.model_dump_json() + "\n"
+            yield json.dumps({
+                "summary": {
+                    "questions": len(questions),
+                    "failed": failed,
+                    "retrieval_time": retrieval_time,
+                    "total_time": time.perf_counter() - start_time,
+                }
+            }) + "\n"
+        finally:
+            # Client disconnected mid-stream, stop spending model calls
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
@@ -6,6 +6,15 @@ class Settings(BaseSettings):
     CHROMA_PERSIST_DIR: str = "./chroma_db"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    TOP_K_PER_DOCUMENT: int = 4
+    # Limit for the context packed into each prompt, source labels included
+    CONTEXT_TOKEN_BUDGET: int = 8000
+    BATCH_MAX_QUESTIONS: int = 100
+    BATCH_MAX_CONCURRENCY: int = 8
+    OCR_CACHE_DIR: str = "./ocr_cache"
+    OCR_CACHE_MAX_MB: int = 256
+    OCR_DPI: int = 300
+    OCR_LANGUAGE: str = "eng"
 
     class Config:
         env_file = ".env"
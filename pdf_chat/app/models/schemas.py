@@ -1,7 +1,38 @@
 from pydantic import BaseModel
+from typing import List, Optional
 
 class QueryRequest(BaseModel):
     query: str
+    document_ids: Optional[List[str]] = None
+
+class Source(BaseModel):
+    document_id: str
+    filename: Optional[str] = None
+    page: Optional[int] = None
+
+class PromptStats(BaseModel):
+    prompt_tokens: int
+    context_passages: int
+    passages_used: int
+    deduped_chars: int
 
 class QueryResponse(BaseModel):
-    answer: str 
\ No newline at end of file
+    answer: str
+    sources: List[Source] = []
+    prompt: Optional[PromptStats] = None
+    # Requested documents whose retrieval failed, the answer does not cover them
+    failed_document_ids: List[str] = []
+
+class BatchQueryRequest(BaseModel):
+    document_id: str
+    questions: List[str]
+    max_concurrency: Optional[int] = None
+
+class BatchAnswer(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    sources: List[Source] = []
+    prompt: Optional[PromptStats] = None
+    latency: float
\ No newline at end of file
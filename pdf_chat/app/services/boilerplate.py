@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional, Set, Tuple
+from collections import Counter
+import re
+
+# "Page 3", "Page 3 of 20", "3 of 20", "3 / 20"
+EXPLICIT_PAGE_NUMBER = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+)$", re.IGNORECASE)
+BARE_NUMBER = re.compile(r"^\d{1,5}$")
+# How many lines at the top and bottom of a page can hold a running header or footer
+EDGE_LINES = 2
+MAX_BOILERPLATE_LINE = 120
+
+
+def edge_lines(text: str) -> List[str]:
+    """The lines a running header, footer or page number can sit on, top to bottom.
+
+    The first entry is the page's first line and the last entry its last line.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) <= 2 * EDGE_LINES:
+        return lines
+    return lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+
+
+def detect_boilerplate(pages: List[Tuple[int, List[str]]]) -> Tuple[Set[str], Optional[int]]:
+    """Find running headers/footers and the page numbering from each page's edge_lines().
+
+    pages holds (page number, edge lines) for every page of the document, so repeats are
+    counted against the whole document. Returns the edge lines repeated on at least half of
+    the pages (and at least three), plus the offset between printed page numbers and page
+    positions when bare numbers on the first or last line count up page by page. Numbers that
+    don't follow the page order, such as a table total or a year, are never page numbers.
+    """
+    edge_counts = Counter(
+        line
+        for _, edges in pages
+        for line in set(edges)
+        if len(line) <= MAX_BOILERPLATE_LINE
+    )
+    threshold = max(3, len(pages) // 2)
+    boilerplate = {line for line, count in edge_counts.items() if count >= threshold}
+
+    offsets = Counter()
+    for page_number, edges in pages:
+        for line in {edges[0], edges[-1]} if edges else ():
+            if BARE_NUMBER.match(line):
+                offsets[int(line) - page_number] += 1
+    page_offset = None
+    if offsets:
+        offset, count = offsets.most_common(1)[0]
+        # A single page can't show a sequence
+        if count >= 2 and count >= len(pages) // 2:
+            page_offset = offset
+    return boilerplate, page_offset
+
+
+def strip_page(text: str, page_number: int, boilerplate: Set[str], page_offset: Optional[int]) -> Tuple[str, int]:
+    """Remove header/footer lines and the page number from one page. Returns (text, lines removed)."""
+    lines = text.splitlines()
+    content = [index for index, line in enumerate(lines) if line.strip()]
+    if not content:
+        return text, 0
+    edge_indexes = set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+    outer_indexes = {content[0], content[-1]}
+
+    removed = set()
+    for index in edge_indexes:
+        line = lines[index].strip()
+        if line in boilerplate:
+            removed.add(index)
+        elif index in outer_indexes:
+            if EXPLICIT_PAGE_NUMBER.match(line):
+                removed.add(index)
+            elif page_offset is not None and BARE_NUMBER.match(line) and int(line) - page_number == page_offset:
+                removed.add(index)
+
+    kept = [line for index, line in enumerate(lines) if index not in removed]
+    return "\n".join(kept).strip(), len(removed)
+
+
+def strip_pages(pages: List[Tuple[int, str]], boilerplate: Set[str], page_offset: Optional[int]) -> Tuple[Dict[int, str], int]:
+    """strip_page over many pages. Returns (page number -> text, total lines removed)."""
+    stripped = {}
+    removed = 0
+    for page_number, text in pages:
+        stripped[page_number], count = strip_page(text, page_number, boilerplate, page_offset)
+        removed += count
+    return stripped, removed
@@ -2,6 +2,9 @@ import google.generativeai as genai
 from typing import List
 import numpy as np
 
+# Upper bound on texts per batchEmbedContents request
+EMBED_BATCH_SIZE = 100
+
 class EmbeddingService:
     def __init__(self, api_key: str):
         genai.configure(api_key=api_key)
@@ -16,4 +19,16 @@ class EmbeddingService:
                 task_type="retrieval_document"
             )
             embeddings.append(embedding['embedding'])
-        return embeddings 
\ No newline at end of file
+        return embeddings
+
+    async def get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries with one request per batch instead of one request per query."""
+        embeddings = []
+        for start in range(0, len(queries), EMBED_BATCH_SIZE):
+            result = genai.embed_content(
+                model=self.model,
+                content=queries[start:start + EMBED_BATCH_SIZE],
+                task_type="retrieval_query"
+            )
+            embeddings.extend(result['embedding'])
+        return embeddings
\ No newline at end of file
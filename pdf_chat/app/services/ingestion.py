@@ -0,0 +1,124 @@
+from typing import Dict, List
+from collections import defaultdict
+import json
+import logging
+import time
+
+from .boilerplate import detect_boilerplate, edge_lines, strip_pages
+from .pdf_processor import PDFProcessor
+from .embeddings import EmbeddingService
+from .vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionService:
+    def __init__(self, pdf_processor: PDFProcessor, embedding_service: EmbeddingService, vector_store: VectorStore):
+        self.pdf_processor = pdf_processor
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+
+    async def _stored_pages(self, document_id: str) -> Dict[str, List[Dict]]:
+        """Group a document's stored chunks into pages, keyed by page fingerprint."""
+        stored = await self.vector_store.get_document_chunks(document_id)
+        pages = defaultdict(dict)
+        for chunk_id, metadata in zip(stored['ids'], stored['metadatas']):
+            if not metadata or "fingerprint" not in metadata:
+                # Chunks ingested before fingerprinting can't be matched, treat them as stale
+                pages[None].setdefault(None, {"page": None, "ids": []})["ids"].append(chunk_id)
+                continue
+            page = pages[metadata["fingerprint"]].setdefault(
+                metadata["page"],
+                {"page": metadata["page"], "ids": [], "metadatas": []}
+            )
+            page["ids"].append(chunk_id)
+            page["metadatas"].append(metadata)
+        return {fingerprint: list(by_page.values()) for fingerprint, by_page in pages.items()}
+
+    async def ingest(self, pdf_file, document_id: str, filename: str) -> Dict:
+        """Index a document, or a new revision of one, touching only the pages that changed.
+
+        Unchanged pages keep their chunks and embeddings (renumbered if they moved), changed
+        pages are extracted and embedded again, and chunks of pages that no longer exist are removed.
+        Running headers, footers and page numbers are stripped from the edges of each changed page
+        before it is chunked. They are detected across every page of this revision, using the edge
+        lines stored with the chunks of unchanged pages, so a few rewritten pages that happen to end
+        the same way are not mistaken for a footer.
+        """
+        start_time = time.time()
+        stored_pages = await self._stored_pages(document_id)
+        known_fingerprints = {
+            fingerprint: len(candidates)
+            for fingerprint, candidates in stored_pages.items()
+            if fingerprint is not None
+        }
+        pages = await self.pdf_processor.read_pages(pdf_file, known_fingerprints)
+
+        moved_ids, moved_metadatas = [], []
+        page_edges = []
+        changed = []
+        for page in pages:
+            # read_pages left the text out exactly for the pages that have a stored copy
+            if page["text"] is None:
+                candidates = stored_pages[page["fingerprint"]]
+                # Prefer the stored copy already at this page number, so identical pages don't swap
+                match = next((c for c in candidates if c["page"] == page["page"]), candidates[0])
+                candidates.remove(match)
+                if match["page"] != page["page"] or match["metadatas"][0].get("filename") != filename:
+                    moved_ids.extend(match["ids"])
+                    moved_metadatas.extend(
+                        {**metadata, "page": page["page"], "filename": filename}
+                        for metadata in match["metadatas"]
+                    )
+                # Chunks stored before edge lines were recorded just don't count towards repeats
+                page_edges.append((page["page"], json.loads(match["metadatas"][0].get("edge_lines", "[]"))))
+                continue
+            edges = edge_lines(page["text"])
+            page_edges.append((page["page"], edges))
+            changed.append({**page, "edge_lines": edges})
+
+        boilerplate, page_offset = detect_boilerplate(page_edges)
+        page_texts, boilerplate_lines = strip_pages(
+            [(page["page"], page["text"]) for page in changed], boilerplate, page_offset
+        )
+        chunks = []
+        for page in changed:
+            for chunk in self.pdf_processor.split_page(page_texts[page["page"]], page["page"]):
+                chunks.append({**chunk, "fingerprint": page["fingerprint"], "edge_lines": page["edge_lines"]})
+
+        stale_ids = [
+            chunk_id
+            for candidates in stored_pages.values()
+            for candidate in candidates
+            for chunk_id in candidate["ids"]
+        ]
+
+        if chunks:
+            texts = [chunk["text"] for chunk in chunks]
+            metadatas = [
+                {
+                    "document_id": document_id,
+                    "filename": filename,
+                    "page": chunk["page"],
+                    "fingerprint": chunk["fingerprint"],
+                    # Unstripped edges of the page, for detecting boilerplate in later revisions
+                    "edge_lines": json.dumps(chunk["edge_lines"]),
+                }
+                for chunk in chunks
+            ]
+            embeddings = await self.embedding_service.get_embeddings(texts)
+            await self.vector_store.add_documents(texts, embeddings, metadatas)
+        await self.vector_store.update_metadatas(moved_ids, moved_metadatas)
+        await self.vector_store.delete(stale_ids)
+
+        logger.info(
+            f"Ingested document {document_id}: {len(changed)}/{len(pages)} pages changed, "
+            f"{len(chunks)} chunks embedded, {len(stale_ids)} removed, {boilerplate_lines} boilerplate lines "
+            f"stripped in {time.time() - start_time:.2f}s"
+        )
+        return {
+            "pages": len(pages),
+            "pages_changed": len(changed),
+            "chunks_added": len(chunks),
+            "chunks_removed": len(stale_ids),
+        }
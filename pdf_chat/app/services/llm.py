@@ -1,9 +1,20 @@
 import google.generativeai as genai
-from typing import List
+from typing import List, Dict, Optional, Tuple
+from .prompt_builder import PromptBuilder
+
+INSTRUCTIONS = (
+    "Based on the following context, answer the question.\n"
+    'If the answer cannot be found in the context, say "I cannot find the answer in the provided document."'
+)
+CITATION_INSTRUCTIONS = (
+    "\nEach passage starts with its source in brackets. Cite the document and page for every claim, "
+    "and compare the documents where the question asks for it."
+)
 
 class LLMService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, context_token_budget: int = 8000, chunk_overlap: int = 200):
         genai.configure(api_key=api_key)
+        self.prompt_builder = PromptBuilder(token_budget=context_token_budget, chunk_overlap=chunk_overlap)
         # Configure the model
         generation_config = {
             "temperature": 0.7,
@@ -36,22 +47,29 @@ class LLMService:
             safety_settings=safety_settings
         )
 
-    async def generate_response(self, query: str, context: List[str]) -> str:
-        try:
-            prompt = f"""Based on the following context, answer the question. 
-            If the answer cannot be found in the context, say "I cannot find the answer in the provided document."
-            
-            Context:
-            {' '.join(context)}
-            
-            Question: {query}
-            
-            Answer:"""
+    async def generate_response(
+        self,
+        query: str,
+        context: List[str],
+        labels: Optional[List[str]] = None,
+        raise_errors: bool = False
+    ) -> Tuple[str, Dict, List[int]]:
+        """Answer a query from context passages. Passing source labels asks the model to cite them.
 
-            response = self.model.generate_content(prompt)
+        Returns the answer, the prompt stats from the prompt builder and the indices of the
+        passages that were sent to the model. Model errors
+        are turned into an apology unless raise_errors is set, for callers that count failures.
+        """
+        instructions = INSTRUCTIONS + (CITATION_INSTRUCTIONS if labels else "")
+        prompt, stats, used = self.prompt_builder.build(query, context, instructions, labels)
+        try:
+            # Async call so concurrent requests don't block the event loop while waiting on the model
+            response = await self.model.generate_content_async(prompt)
             if response.prompt_feedback.block_reason:
-                return "I apologize, but I cannot provide an answer due to content safety restrictions."
-            return response.text
+                return "I apologize, but I cannot provide an answer due to content safety restrictions.", stats, used
+            return response.text, stats, used
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "I apologize, but I encountered an error while processing your question. Please try again." 
\ No newline at end of file
+            if raise_errors:
+                raise
+            return "I apologize, but I encountered an error while processing your question. Please try again.", stats, used
@@ -0,0 +1,135 @@
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# After pruning the cache holds at most this fraction of its cap
+PRUNE_TARGET = 0.9
+
+
+def _ocr_page(page_pdf: bytes, dpi: int, language: str) -> str:
+    """Render a single-page PDF in grayscale and run Tesseract on it. Runs inside a worker process."""
+    with fitz.open(stream=page_pdf, filetype="pdf") as doc:
+        pix = doc[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+    return pytesseract.image_to_string(image, lang=language)
+
+
+class OCRService:
+    def __init__(
+        self,
+        cache_dir: str = "./ocr_cache",
+        dpi: int = 300,
+        language: str = "eng",
+        max_workers: Optional[int] = None,
+        max_cache_bytes: int = 256 * 1024 * 1024
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.dpi = dpi
+        self.language = language
+        self.executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+
+    def _cache_path(self, fingerprint: str) -> Path:
+        key = hashlib.sha256(f"{fingerprint}:{self.dpi}:{self.language}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.txt"
+
+    def _read_cached(self, fingerprint: str) -> Optional[str]:
+        cache_path = self._cache_path(fingerprint)
+        try:
+            text = cache_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        # Bump the mtime so pruning sees the entry as recently used
+        os.utime(cache_path)
+        return text
+
+    def _prune_cache(self) -> int:
+        """Remove the least recently used entries once the cache exceeds max_cache_bytes."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        usage = sum(size for _, size, _ in entries)
+        if usage <= self.max_cache_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if usage <= self.max_cache_bytes * PRUNE_TARGET:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            usage -= size
+            removed += 1
+        return removed
+
+    async def _ocr(self, page_pdf: bytes, fingerprint: str) -> str:
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self.executor, _ocr_page, page_pdf, self.dpi, self.language)
+        cache_path = self._cache_path(fingerprint)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+        return text
+
+    async def ocr_pages(self, pdf_bytes: bytes, pages: List[Tuple[int, str]]) -> Dict[int, str]:
+        """OCR (page index, page fingerprint) pairs in parallel and return page index -> text.
+
+        Results are cached on disk by page fingerprint. The cache is capped at max_cache_bytes and
+        drops least recently used pages first. Pages that fail come back as empty text.
+        """
+        start_time = time.time()
+        texts = {}
+        missing = []
+        for page_index, fingerprint in pages:
+            text = self._read_cached(fingerprint)
+            if text is None:
+                missing.append((page_index, fingerprint))
+            else:
+                texts[page_index] = text
+        if not missing:
+            return texts
+
+        # Workers get just their page, not the whole document
+        page_pdfs = []
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            for page_index, _ in missing:
+                with fitz.open() as page_doc:
+                    page_doc.insert_pdf(doc, from_page=page_index, to_page=page_index)
+                    page_pdfs.append(page_doc.tobytes())
+
+        results = await asyncio.gather(
+            *(self._ocr(page_pdf, fingerprint) for page_pdf, (_, fingerprint) in zip(page_pdfs, missing)),
+            return_exceptions=True
+        )
+        for (page_index, _), result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.error(f"OCR failed for page {page_index + 1}: {result}")
+                result = ""
+            texts[page_index] = result
+        logger.info(
+            f"OCR of {len(missing)} pages completed in {time.time() - start_time:.2f}s, "
+            f"{len(pages) - len(missing)} served from cache"
+        )
+
+        try:
+            removed = await asyncio.to_thread(self._prune_cache)
+            if removed:
+                logger.info(f"Pruned {removed} entries from the OCR cache")
+        except Exception as e:
+            logger.warning(f"Failed to prune OCR cache: {e}")
+        return texts
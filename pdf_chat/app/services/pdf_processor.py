@@ -1,17 +1,74 @@
 from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List
+from typing import List, Dict, Optional
+from io import BytesIO
+import hashlib
 import logging
 
+from .ocr import OCRService
+
 logger = logging.getLogger(__name__)
 
+# Pages with less text than this are treated as having no text layer
+MIN_TEXT_CHARS = 20
+
+def _resource(page, key: str) -> Dict:
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    entry = resources.get(key)
+    return entry.get_object() if entry is not None else {}
+
+def _xobjects(page) -> Dict:
+    return _resource(page, "/XObject")
+
+def _raw_stream(stream) -> bytes:
+    """Describe a stream by its encoded bytes and filters, without decoding it.
+
+    pypdf can't decode every image filter (JBIG2 scans raise NotImplementedError), and decoding
+    every image on every upload would make a revision cost as much as the first ingest.
+    Decode parameters can point at other streams, e.g. /JBIG2Globals, which are described the
+    same way so no object numbers end up in the hash.
+    """
+    def describe(value):
+        value = value.get_object() if hasattr(value, "get_object") else value
+        if hasattr(value, "_data"):
+            return (value._data, describe(value.get("/Filter")), describe(value.get("/DecodeParms")))
+        if isinstance(value, dict):
+            return sorted((str(key), describe(item)) for key, item in value.items())
+        if isinstance(value, list):
+            return [describe(item) for item in value]
+        return str(value)
+
+    return repr(describe(stream)).encode()
+
+def _font_fingerprint(name: str, font) -> bytes:
+    """Describe how a font maps character codes to text, without its object numbers.
+
+    Object numbers differ between revisions of the same document, so they must stay out of the
+    hash. The ToUnicode map and encoding differences are what decide the extracted text.
+    """
+    parts = [name, str(font.get("/Subtype")), str(font.get("/BaseFont"))]
+    encoding = font.get("/Encoding")
+    if encoding is not None:
+        encoding = encoding.get_object()
+        if hasattr(encoding, "get"):
+            parts.append(str(encoding.get("/BaseEncoding")))
+            parts.append(str(encoding.get("/Differences")))
+        else:
+            parts.append(str(encoding))
+    to_unicode = font.get("/ToUnicode")
+    if to_unicode is not None:
+        parts.append(to_unicode.get_object().get_data())
+    return repr(parts).encode()
+
 class PDFProcessor:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, ocr_service: Optional[OCRService] = None):
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=len
         )
+        self.ocr_service = ocr_service
 
     def extract_text(self, pdf_file) -> str:
         try:
@@ -24,5 +81,69 @@ class PDFProcessor:
             logger.error(f"Error extracting text from PDF: {e}")
             raise
 
+    def fingerprint_page(self, page) -> str:
+        """Hash of what a page's text is drawn from, computed without extracting the text."""
+        digest = hashlib.sha256()
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        fonts = _resource(page, "/Font")
+        for name in sorted(fonts):
+            # The same content bytes produce different text under different font encodings,
+            # e.g. subset fonts that assign codes in first-use order
+            digest.update(_font_fingerprint(name, fonts[name].get_object()))
+        xobjects = _xobjects(page)
+        for name in sorted(xobjects):
+            # Form XObjects often hold headers and tables, and images are all a scanned page has
+            xobject = xobjects[name].get_object()
+            if xobject.get("/Subtype") in ("/Form", "/Image"):
+                digest.update(name.encode())
+                digest.update(_raw_stream(xobject))
+        digest.update(repr((list(page.mediabox), page.rotation)).encode())
+        return digest.hexdigest()
+
+    def needs_ocr(self, page, text: str) -> bool:
+        """True for pages whose text layer is empty but that carry images, i.e. scans."""
+        if len(text.strip()) >= MIN_TEXT_CHARS:
+            return False
+        xobjects = _xobjects(page)
+        return any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+
+    async def read_pages(self, pdf_file, known_fingerprints: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """Fingerprint every page, extracting text only for pages not already known.
+
+        known_fingerprints maps a fingerprint to how many stored pages carry it, so a revision
+        that repeats a page more often than before still extracts the extra copies. Pages
+        without a text layer are OCR'd when an OCR service is configured.
+        """
+        remaining = dict(known_fingerprints or {})
+        try:
+            pdf_bytes = pdf_file.read()
+            reader = PdfReader(BytesIO(pdf_bytes))
+            pages = []
+            ocr_pages = []
+            for page_number, page in enumerate(reader.pages, 1):
+                fingerprint = self.fingerprint_page(page)
+                if remaining.get(fingerprint, 0) > 0:
+                    remaining[fingerprint] -= 1
+                    text = None
+                else:
+                    text = page.extract_text()
+                    if self.ocr_service and self.needs_ocr(page, text):
+                        ocr_pages.append((page_number - 1, fingerprint))
+                pages.append({"page": page_number, "fingerprint": fingerprint, "text": text})
+        except Exception as e:
+            logger.error(f"Error extracting text from PDF: {e}")
+            raise
+
+        if ocr_pages:
+            ocr_texts = await self.ocr_service.ocr_pages(pdf_bytes, ocr_pages)
+            for page_index, text in ocr_texts.items():
+                pages[page_index]["text"] = text
+        return pages
+
     def split_text(self, text: str) -> List[str]:
-        return self.text_splitter.split_text(text) 
\ No newline at end of file
+        return self.text_splitter.split_text(text)
+
+    def split_page(self, text: str, page_number: int) -> List[Dict]:
+        return [{"text": chunk, "page": page_number} for chunk in self.text_splitter.split_text(text)]
@@ -0,0 +1,95 @@
+from typing import List, Dict, Optional, Tuple
+import re
+
+# Words, digit runs and single punctuation marks, roughly how SentencePiece splits text
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_+")
+# Shortest prefix/suffix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def count_tokens(text: str) -> int:
+    """Local token estimate, slightly on the high side so budgets are not overrun."""
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        if piece.isdigit():
+            # Gemini tokenizes numbers one digit at a time
+            tokens += len(piece)
+        else:
+            tokens += 1 + (len(piece) - 1) // 5
+    return tokens
+
+
+def _overlap(previous: str, current: str, max_overlap: int) -> int:
+    """Length of the longest suffix of previous that current starts with."""
+    for length in range(min(len(previous), len(current), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:length]):
+            return length
+    return 0
+
+
+class PromptBuilder:
+    def __init__(self, token_budget: int = 8000, chunk_overlap: int = 200):
+        self.token_budget = token_budget
+        # Overlap between consecutive chunks can't be longer than the splitter's overlap
+        self.max_overlap = max(chunk_overlap, MIN_OVERLAP_CHARS)
+
+    def dedupe(self, passages: List[str]) -> Tuple[List[Optional[str]], int]:
+        """Trim the overlap a chunk shares with one already kept and drop chunks contained in another.
+
+        Dropped passages come back as None so callers can keep labels aligned.
+        """
+        kept: List[Optional[str]] = []
+        removed_chars = 0
+        for passage in passages:
+            if any(passage in other for other in kept if other):
+                kept.append(None)
+                removed_chars += len(passage)
+                continue
+            overlap = max((_overlap(other, passage, self.max_overlap) for other in kept if other), default=0)
+            kept.append(passage[overlap:].lstrip())
+            removed_chars += overlap
+        return kept, removed_chars
+
+    def build(
+        self,
+        query: str,
+        context: List[str],
+        instructions: str,
+        labels: Optional[List[str]] = None
+    ) -> Tuple[str, Dict, List[int]]:
+        """Build a prompt whose context fits the token budget. Context is expected in relevance order.
+
+        Labels count against the budget together with their passages. Returns the prompt, its stats
+        and the indices of the context passages that made it in, so callers can cite exactly those.
+        Headers, footers and page numbers are stripped per page at ingestion, chunks are used as stored.
+        """
+        deduped, deduped_chars = self.dedupe(context)
+
+        prefix = f"{instructions}\n\nContext:\n"
+        suffix = f"\n\nQuestion: {query}\n\nAnswer:"
+        used_tokens = count_tokens(prefix) + count_tokens(suffix)
+        budget = self.token_budget + used_tokens
+
+        selected = []
+        used = []
+        for index, passage in enumerate(deduped):
+            if not passage:
+                continue
+            if labels:
+                passage = f"{labels[index]}\n{passage}"
+            tokens = count_tokens(passage)
+            if used_tokens + tokens > budget:
+                continue
+            selected.append(passage)
+            used.append(index)
+            used_tokens += tokens
+
+        prompt = prefix + "\n\n".join(selected) + suffix
+        stats = {
+            "prompt_tokens": count_tokens(prompt),
+            "context_passages": len(context),
+            "passages_used": len(selected),
+            "deduped_chars": deduped_chars,
+        }
+        return prompt, stats, used
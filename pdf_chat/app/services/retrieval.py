@@ -0,0 +1,105 @@
+from typing import List, Dict, Tuple
+import asyncio
+import logging
+
+from .vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalService:
+    def __init__(self, vector_store: VectorStore, top_k: int = 4):
+        self.vector_store = vector_store
+        self.top_k = top_k
+
+    def _parse_results(self, results: Dict, index: int, document_id: str) -> List[Dict]:
+        return [
+            {
+                "text": text,
+                "document_id": document_id,
+                "filename": (metadata or {}).get("filename"),
+                "page": (metadata or {}).get("page"),
+                "distance": distance,
+            }
+            for text, metadata, distance in zip(
+                results['documents'][index],
+                results['metadatas'][index],
+                results['distances'][index]
+            )
+        ]
+
+    async def _query_document(self, query_embedding: List[float], document_id: str) -> List[Dict]:
+        results = await self.vector_store.query(
+            query_embedding,
+            n_results=self.top_k,
+            where={"document_id": document_id}
+        )
+        return self._parse_results(results, 0, document_id)
+
+    async def retrieve_batch(self, query_embeddings: List[List[float]], document_id: str) -> List[List[Dict]]:
+        """Top-k passages of one document for many queries, searched in a single vector store call."""
+        results = await self.vector_store.query_many(
+            query_embeddings,
+            n_results=self.top_k,
+            where={"document_id": document_id}
+        )
+        return [self._parse_results(results, index, document_id) for index in range(len(query_embeddings))]
+
+    async def retrieve(
+        self,
+        query_embedding: List[float],
+        document_ids: List[str]
+    ) -> Tuple[List[Dict], List[str], List[str]]:
+        """Query every document in parallel and rank the passages for the prompt.
+
+        Returns (passages, ids with no stored chunks, ids whose query failed), so callers can
+        tell the user which documents the answer does not cover. The token budget is applied
+        once, by the prompt builder, in the order returned here.
+        """
+        per_document = await asyncio.gather(
+            *(self._query_document(query_embedding, document_id) for document_id in document_ids),
+            return_exceptions=True
+        )
+
+        hits = []
+        missing, failed = [], []
+        for document_id, result in zip(document_ids, per_document):
+            if isinstance(result, Exception):
+                logger.error(f"Retrieval failed for document {document_id}: {result}")
+                failed.append(document_id)
+                continue
+            if not result:
+                missing.append(document_id)
+                continue
+            hits.append(result)
+
+        # Every document gets its best passage first so none is crowded out by a verbose neighbour,
+        # the remaining budget then goes to the closest passages overall
+        best = sorted((passages[0] for passages in hits), key=lambda passage: passage["distance"])
+        rest = sorted(
+            (passage for passages in hits for passage in passages[1:]),
+            key=lambda passage: passage["distance"]
+        )
+        ranked = best + rest
+
+        logger.info(f"Retrieved {len(ranked)} passages from {len(hits)}/{len(document_ids)} documents")
+        return ranked, missing, failed
+
+
+def passage_labels(passages: List[Dict]) -> List[str]:
+    """Source label for each passage, so the model can cite it."""
+    return [
+        f"[{passage['filename'] or passage['document_id']}, page {passage['page']}]"
+        for passage in passages
+    ]
+
+
+def passage_sources(passages: List[Dict]) -> List[Dict]:
+    """Unique (document, page) sources in the order they were used."""
+    seen = dict.fromkeys(
+        (passage["document_id"], passage["filename"], passage["page"]) for passage in passages
+    )
+    return [
+        {"document_id": document_id, "filename": filename, "page": page}
+        for document_id, filename, page in seen
+    ]
@@ -1,6 +1,7 @@
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict
+from typing import List, Dict, Optional
+import asyncio
 import uuid
 
 class VectorStore:
@@ -11,17 +12,61 @@ class VectorStore:
         ))
         self.collection = self.client.get_or_create_collection("pdf_chunks")
 
-    async def add_documents(self, texts: List[str], embeddings: List[List[float]]):
+    async def add_documents(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict]] = None
+    ):
         ids = [str(uuid.uuid4()) for _ in texts]
         self.collection.add(
             embeddings=embeddings,
             documents=texts,
+            metadatas=metadatas,
             ids=ids
         )
 
-    async def query(self, query_embedding: List[float], n_results: int = 3) -> List[Dict]:
-        results = self.collection.query(
+    async def get_document_chunks(self, document_id: str) -> Dict:
+        """Ids and metadata of every chunk stored for a document."""
+        return await asyncio.to_thread(
+            self.collection.get,
+            where={"document_id": document_id},
+            include=["metadatas"]
+        )
+
+    async def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        if ids:
+            await asyncio.to_thread(self.collection.update, ids=ids, metadatas=metadatas)
+
+    async def delete(self, ids: List[str]):
+        if ids:
+            await asyncio.to_thread(self.collection.delete, ids=ids)
+
+    async def query(
+        self,
+        query_embedding: List[float],
+        n_results: int = 3,
+        where: Optional[Dict] = None
+    ) -> List[Dict]:
+        # Run the blocking Chroma query off the event loop so concurrent queries can overlap
+        results = await asyncio.to_thread(
+            self.collection.query,
             query_embeddings=[query_embedding],
-            n_results=n_results
+            n_results=n_results,
+            where=where
         )
-        return results 
\ No newline at end of file
+        return results
+
+    async def query_many(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 3,
+        where: Optional[Dict] = None
+    ) -> Dict:
+        """Search for several queries in a single Chroma call. Results are indexed per query."""
+        return await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where
+        )
\ No newline at end of file
@@ -0,0 +1,74 @@
+from app.services.boilerplate import detect_boilerplate, edge_lines, strip_page, strip_pages
+
+
+def numbered(pages):
+    return list(enumerate(pages, 1))
+
+
+def detect(pages):
+    return detect_boilerplate([(page_number, edge_lines(text)) for page_number, text in pages])
+
+
+def test_repeated_header_and_page_numbers_are_stripped():
+    pages = numbered([f"ACME Confidential\nBody of page {n}\n{n}" for n in range(1, 6)])
+
+    boilerplate, page_offset = detect(pages)
+    stripped, removed = strip_pages(pages, boilerplate, page_offset)
+
+    assert boilerplate == {"ACME Confidential"}
+    assert page_offset == 0
+    assert stripped[3] == "Body of page 3"
+    assert removed == 10
+
+
+def test_printed_numbers_offset_from_page_positions():
+    # Front matter shifts printed numbers, they still count up page by page
+    pages = numbered([f"Chapter text {n}\n{n + 10}" for n in range(1, 5)])
+
+    boilerplate, page_offset = detect(pages)
+
+    assert page_offset == 10
+    assert strip_page(pages[1][1], 2, boilerplate, page_offset) == ("Chapter text 2", 1)
+
+
+def test_numbers_inside_a_page_are_kept():
+    table = "Revenue table\nQ1\n1200\nQ2\n1350\nQ3\n1500\nEnd of table"
+    pages = numbered([table, "Intro\n2", "Summary\n3"])
+
+    boilerplate, page_offset = detect(pages)
+    text, removed = strip_page(table, 1, boilerplate, page_offset)
+
+    assert text == table
+    assert removed == 0
+
+
+def test_numbers_that_do_not_follow_page_order_are_kept():
+    pages = numbered(["Total\n1200", "Total\n875", "Published\n2023"])
+
+    boilerplate, page_offset = detect(pages)
+    stripped, removed = strip_pages(pages, boilerplate, page_offset)
+
+    assert page_offset is None
+    assert stripped == {1: "Total\n1200", 2: "Total\n875", 3: "Published\n2023"}
+    assert removed == 0
+
+
+def test_repeated_lines_away_from_the_edges_are_kept():
+    pages = numbered([f"Heading {n}\nIntro\nTotal\nmore\nFooter {n}\nend" for n in range(1, 6)])
+
+    boilerplate, _ = detect(pages)
+
+    assert "Total" not in boilerplate
+    assert "Total" in strip_page(pages[0][1], 1, boilerplate, None)[0]
+
+
+def test_explicit_page_numbers_only_on_the_outer_lines():
+    text = "Page 4 of 9\nSee page 2 of 9\nbody\nlast line"
+
+    assert strip_page(text, 4, set(), None) == ("See page 2 of 9\nbody\nlast line", 1)
+    assert strip_page("body\n2 / 9\nmore", 2, set(), None) == ("body\n2 / 9\nmore", 0)
+
+
+def test_edge_lines_are_the_outer_lines_in_page_order():
+    assert edge_lines("a\n\n b \nc\nd\ne\nf") == ["a", "b", "e", "f"]
+    assert edge_lines("only\n") == ["only"]
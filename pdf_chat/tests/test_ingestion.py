@@ -0,0 +1,244 @@
+import asyncio
+import uuid
+
+from app.services.ingestion import IngestionService
+from app.services.pdf_processor import PDFProcessor
+
+
+class FakePDFProcessor(PDFProcessor):
+    """Reads a "PDF" given as a list of (fingerprint, text) pages.
+
+    Follows the read_pages contract: text is None for pages covered by known_fingerprints,
+    counting each known fingerprint down so repeated pages beyond the stored count get text.
+    """
+
+    def __init__(self):
+        super().__init__(chunk_size=1000, chunk_overlap=0)
+        self.extracted = []
+
+    async def read_pages(self, pdf_file, known_fingerprints=None):
+        remaining = dict(known_fingerprints or {})
+        pages = []
+        for page_number, (fingerprint, text) in enumerate(pdf_file, 1):
+            if remaining.get(fingerprint, 0) > 0:
+                remaining[fingerprint] -= 1
+                text = None
+            else:
+                self.extracted.append(page_number)
+            pages.append({"page": page_number, "fingerprint": fingerprint, "text": text})
+        return pages
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.embedded = []
+
+    async def get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.chunks = {}  # id -> {"text", "metadata"}
+
+    async def add_documents(self, texts, embeddings, metadatas=None):
+        for text, metadata in zip(texts, metadatas):
+            self.chunks[str(uuid.uuid4())] = {"text": text, "metadata": dict(metadata)}
+
+    async def get_document_chunks(self, document_id):
+        ids = [
+            chunk_id for chunk_id, chunk in self.chunks.items()
+            if chunk["metadata"].get("document_id") == document_id
+        ]
+        return {"ids": ids, "metadatas": [dict(self.chunks[chunk_id]["metadata"]) for chunk_id in ids]}
+
+    async def update_metadatas(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.chunks[chunk_id]["metadata"] = dict(metadata)
+
+    async def delete(self, ids):
+        for chunk_id in ids:
+            del self.chunks[chunk_id]
+
+    def pages(self, document_id):
+        """(page, text) of every stored chunk of a document, in page order."""
+        return sorted(
+            (chunk["metadata"]["page"], chunk["text"])
+            for chunk in self.chunks.values()
+            if chunk["metadata"]["document_id"] == document_id
+        )
+
+
+def make_service():
+    processor = FakePDFProcessor()
+    embeddings = FakeEmbeddingService()
+    store = FakeVectorStore()
+    return IngestionService(processor, embeddings, store), processor, embeddings, store
+
+
+def ingest(service, pages, document_id="doc", filename="doc.pdf"):
+    return asyncio.run(service.ingest(pages, document_id, filename))
+
+
+def revise(service, processor, embeddings, pages, **kwargs):
+    """Ingest a revision, counting only the extraction and embedding work it does."""
+    processor.extracted.clear()
+    embeddings.embedded.clear()
+    return ingest(service, pages, **kwargs)
+
+
+def test_first_ingest_embeds_every_page():
+    service, processor, embeddings, store = make_service()
+
+    stats = ingest(service, [("a", "alpha"), ("b", "beta")])
+
+    assert stats == {"pages": 2, "pages_changed": 2, "chunks_added": 2, "chunks_removed": 0}
+    assert embeddings.embedded == ["alpha", "beta"]
+    assert store.pages("doc") == [(1, "alpha"), (2, "beta")]
+    assert {chunk["metadata"]["fingerprint"] for chunk in store.chunks.values()} == {"a", "b"}
+
+
+def test_unchanged_revision_reuses_everything():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha"), ("b", "beta")])
+    chunk_ids = set(store.chunks)
+
+    stats = revise(service, processor, embeddings, [("a", "alpha"), ("b", "beta")])
+
+    assert stats == {"pages": 2, "pages_changed": 0, "chunks_added": 0, "chunks_removed": 0}
+    assert processor.extracted == []
+    assert embeddings.embedded == []
+    assert set(store.chunks) == chunk_ids
+
+
+def test_changed_page_is_the_only_one_reprocessed():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha"), ("b", "beta"), ("c", "gamma")])
+
+    stats = revise(service, processor, embeddings, [("a", "alpha"), ("b2", "beta revised"), ("c", "gamma")])
+
+    assert stats["pages_changed"] == 1
+    assert stats["chunks_removed"] == 1
+    assert processor.extracted == [2]
+    assert embeddings.embedded == ["beta revised"]
+    assert store.pages("doc") == [(1, "alpha"), (2, "beta revised"), (3, "gamma")]
+
+
+def test_moved_pages_are_renumbered_without_embedding():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha"), ("b", "beta")])
+
+    stats = revise(service, processor, embeddings, [("new", "preface"), ("a", "alpha"), ("b", "beta")])
+
+    assert stats == {"pages": 3, "pages_changed": 1, "chunks_added": 1, "chunks_removed": 0}
+    assert embeddings.embedded == ["preface"]
+    assert store.pages("doc") == [(1, "preface"), (2, "alpha"), (3, "beta")]
+
+
+def test_new_filename_is_applied_to_reused_chunks():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha")])
+
+    revise(service, processor, embeddings, [("a", "alpha")], filename="doc-v2.pdf")
+
+    assert [chunk["metadata"]["filename"] for chunk in store.chunks.values()] == ["doc-v2.pdf"]
+    assert embeddings.embedded == []
+
+
+def test_removed_pages_are_deleted():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha"), ("b", "beta"), ("c", "gamma")])
+
+    stats = revise(service, processor, embeddings, [("a", "alpha"), ("c", "gamma")])
+
+    assert stats == {"pages": 2, "pages_changed": 0, "chunks_added": 0, "chunks_removed": 1}
+    assert store.pages("doc") == [(1, "alpha"), (2, "gamma")]
+
+
+def test_extra_copy_of_a_duplicate_page_is_embedded():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("blank", "intentionally left blank"), ("a", "alpha")])
+
+    stats = revise(
+        service, processor, embeddings,
+        [("blank", "intentionally left blank"), ("a", "alpha"), ("blank", "intentionally left blank")]
+    )
+
+    assert stats["pages_changed"] == 1
+    assert processor.extracted == [3]
+    assert store.pages("doc") == [
+        (1, "intentionally left blank"), (2, "alpha"), (3, "intentionally left blank")
+    ]
+
+
+def test_duplicate_page_keeps_the_copy_at_its_own_page_number():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("x", "same"), ("a", "alpha"), ("x", "same")])
+    second_copy = next(
+        chunk_id for chunk_id, chunk in store.chunks.items() if chunk["metadata"]["page"] == 3
+    )
+
+    stats = revise(service, processor, embeddings, [("b", "beta"), ("a", "alpha"), ("x", "same")])
+
+    # Page 3 keeps its own chunk, the copy that was on page 1 is the stale one
+    assert stats == {"pages": 3, "pages_changed": 1, "chunks_added": 1, "chunks_removed": 1}
+    assert second_copy in store.chunks
+    assert store.pages("doc") == [(1, "beta"), (2, "alpha"), (3, "same")]
+
+
+def test_chunks_without_fingerprint_are_replaced():
+    service, processor, embeddings, store = make_service()
+    # Stored before page fingerprints existed
+    asyncio.run(store.add_documents(["alpha"], [[1.0]], [{"document_id": "doc", "filename": "doc.pdf", "page": 1}]))
+
+    stats = revise(service, processor, embeddings, [("a", "alpha")])
+
+    assert stats == {"pages": 1, "pages_changed": 1, "chunks_added": 1, "chunks_removed": 1}
+    assert store.pages("doc") == [(1, "alpha")]
+
+
+def test_other_documents_are_untouched():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [("a", "alpha")], document_id="other")
+
+    stats = revise(service, processor, embeddings, [("a", "alpha")], document_id="doc")
+
+    # Fingerprints are matched per document, a page stored for another document is not reused
+    assert stats["chunks_added"] == 1
+    assert store.pages("other") == [(1, "alpha")]
+    assert store.pages("doc") == [(1, "alpha")]
+
+
+def test_headers_and_page_numbers_are_stripped_before_chunking():
+    service, processor, embeddings, store = make_service()
+    pages = [(f"p{n}", f"ACME Annual Report\nBody {n}\nTotal\n{1200 + n}\n{n}") for n in range(1, 5)]
+
+    ingest(service, pages)
+
+    assert store.pages("doc") == [(n, f"Body {n}\nTotal\n{1200 + n}") for n in range(1, 5)]
+
+
+def test_changed_page_is_stripped_with_the_stored_boilerplate():
+    service, processor, embeddings, store = make_service()
+    ingest(service, [(f"p{n}", f"ACME Annual Report\nBody {n}\n{n}") for n in range(1, 5)])
+
+    pages = [(f"p{n}", f"ACME Annual Report\nBody {n}\n{n}") for n in range(1, 5)]
+    pages[2] = ("p3-v2", "ACME Annual Report\nBody 3 revised\n3")
+    revise(service, processor, embeddings, pages)
+
+    # A single changed page can't show repetition on its own, the earlier revision's findings apply
+    assert embeddings.embedded == ["Body 3 revised"]
+
+
+def test_lines_shared_by_a_few_rewritten_pages_are_kept():
+    service, processor, embeddings, store = make_service()
+    pages = [(f"p{n}", f"ACME Annual Report\nBody {n}\n{n}") for n in range(1, 21)]
+    ingest(service, pages)
+
+    for n in (5, 6, 7):
+        pages[n - 1] = (f"t{n}", f"ACME Annual Report\nTable {n}\nQ1 100\nTotal\n{n}")
+    revise(service, processor, embeddings, pages)
+
+    # Three of twenty pages ending the same way is content, not a footer
+    assert sorted(embeddings.embedded) == [f"Table {n}\nQ1 100\nTotal" for n in (5, 6, 7)]
@@ -0,0 +1,56 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from app.services.pdf_processor import PDFProcessor
+
+
+def scanned_pdf(image_data, filter_name):
+    """One-page PDF whose only content is an image stream stored with the given filter."""
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=612, height=792)
+    image = DecodedStreamObject()
+    # Written as-is, so the file carries the bytes as if they were encoded with filter_name
+    image.set_data(image_data)
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(8),
+        NameObject("/Height"): NumberObject(8),
+        NameObject("/BitsPerComponent"): NumberObject(1),
+        NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+        NameObject("/Filter"): NameObject(filter_name),
+    })
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)})
+    })
+    buffer = BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def first_page(pdf_file):
+    return PdfReader(pdf_file).pages[0]
+
+
+@pytest.mark.parametrize("filter_name", ["/JBIG2Decode", "/CCITTFaxDecode"])
+def test_fingerprint_does_not_decode_images(filter_name):
+    processor = PDFProcessor(chunk_size=1000, chunk_overlap=0)
+
+    fingerprint = processor.fingerprint_page(first_page(scanned_pdf(b"scan one", filter_name)))
+
+    assert fingerprint == processor.fingerprint_page(first_page(scanned_pdf(b"scan one", filter_name)))
+    assert fingerprint != processor.fingerprint_page(first_page(scanned_pdf(b"scan two", filter_name)))
+
+
+def test_scanned_page_is_read_without_ocr_service():
+    processor = PDFProcessor(chunk_size=1000, chunk_overlap=0)
+
+    pages = asyncio.run(processor.read_pages(scanned_pdf(b"scan one", "/JBIG2Decode")))
+
+    assert [page["page"] for page in pages] == [1]
+    assert pages[0]["text"] == ""
@@ -0,0 +1,36 @@
+from app.services.prompt_builder import PromptBuilder, count_tokens
+
+INSTRUCTIONS = "Answer the question."
+
+
+def test_used_indices_skip_contained_passages():
+    builder = PromptBuilder(token_budget=1000, chunk_overlap=0)
+    context = ["The contract ends in March 2025.", "ends in March", "Payment is due monthly."]
+
+    prompt, stats, used = builder.build("When?", context, INSTRUCTIONS, ["[a, page 1]", "[a, page 2]", "[b, page 1]"])
+
+    assert used == [0, 2]
+    assert stats["passages_used"] == 2
+    assert "[a, page 2]" not in prompt
+
+
+def test_labels_count_against_the_budget():
+    context = ["alpha beta gamma", "delta epsilon zeta"]
+    labels = ["[a very long document name used as a label, page 1]", "[b, page 2]"]
+    # Room for both passages on their own, but not once the first label is added
+    budget = sum(count_tokens(passage) for passage in context) + count_tokens(labels[1]) + 2
+    builder = PromptBuilder(token_budget=budget, chunk_overlap=0)
+
+    prompt, stats, used = builder.build("Which?", context, INSTRUCTIONS, labels)
+
+    assert used == [1]
+    assert labels[0] not in prompt
+
+
+def test_unlabelled_context_keeps_relevance_order():
+    builder = PromptBuilder(token_budget=1000, chunk_overlap=0)
+
+    prompt, _, used = builder.build("Q", ["first passage", "second passage"], INSTRUCTIONS)
+
+    assert used == [0, 1]
+    assert prompt.index("first passage") < prompt.index("second passage")